@@ -1,34 +1,70 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+import asyncio
+import logging
+import heapq
+import re
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit_aer import AerSimulator
 from qiskit import transpile
+from app.algorithms.simon_kernel import apply_simon
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-class ComplexNumber(BaseModel):
-    """Pydantic-compatible complex number representation"""
-    real: float
-    imag: float
+# Simulator is shared across requests so Aer's internal caches persist. It keeps
+# Aer's default threading: circuits up to KERNEL_STATEVECTOR_MAX_QUBITS never reach
+# it, and above that a 2^25+ amplitude statevector benefits from the OpenMP team
+_SV_SIM = AerSimulator(method='statevector')
+
+_BINARY_RE = re.compile(r'[01]+')
+
+# Largest circuit whose statevector is computed by the Numba kernel instead of Aer
+KERNEL_STATEVECTOR_MAX_QUBITS = 24
+
+# Largest circuit whose simulation results are kept in the per-period cache
+CORE_CACHE_MAX_QUBITS = 20
+
+# Memory budget for that cache, sized by its largest entry (complex128 statevector
+# plus float32 probabilities)
+CORE_CACHE_MAX_BYTES = 256 * 2 ** 20
+CORE_CACHE_SIZE = max(1, CORE_CACHE_MAX_BYTES // (2 ** CORE_CACHE_MAX_QUBITS * (16 + 4)))
+
+class QuantumState(BaseModel):
+    """Largest statevector amplitudes as basis-state indices plus real and imaginary arrays"""
+    indices: List[int]
+    real: List[float]
+    imag: List[float]
 
 class SimonRequest(BaseModel):
     hidden_period: str = "11"
     num_qubits: int = 4
+    top_k: int = Field(256, ge=1)  # Number of most probable basis states returned
+    
+    @field_validator('hidden_period')
+    @classmethod
+    def _validate_hidden_period(cls, v: str) -> str:
+        # Hidden period should be binary
+        if not _BINARY_RE.fullmatch(v):
+            raise ValueError("Hidden period must contain only 0s and 1s")
+        return v
 
 class SimonResponse(BaseModel):
     success: bool
     circuit_data: Dict[str, Any]
-    quantum_state: List[ComplexNumber]
-    probabilities: List[float]
+    quantum_state: QuantumState
+    probabilities: List[float]  # Aligned with quantum_state.indices
     measurement_counts: Dict[str, int]
     linear_equations: List[str]
     recovered_period: str
     hidden_period: str
 
-def create_simon_circuit(hidden_period: str, num_qubits: int) -> QuantumCircuit:
-    """Create Simon's algorithm quantum circuit"""
+def create_simon_circuit(hidden_period: str, num_qubits: int) -> Tuple[QuantumCircuit, QuantumCircuit]:
+    """Create Simon's algorithm quantum circuit, with and without final measurements"""
     # n qubits for input register, n qubits for output register
     if num_qubits % 2 != 0:
         raise ValueError("Number of qubits must be even for Simon's algorithm")
@@ -36,113 +72,177 @@ def create_simon_circuit(hidden_period: str, num_qubits: int) -> QuantumCircuit:
     n = num_qubits // 2
     qreg = QuantumRegister(num_qubits, 'q')
     creg = ClassicalRegister(n, 'c')  # Only measure first register
-    circuit = QuantumCircuit(qreg, creg)
+    circuit_no_measure = QuantumCircuit(qreg, creg)
     
     # Apply Hadamard to first register (input)
-    circuit.h(range(n))
+    circuit_no_measure.h(range(n))
     
     # Apply Simon oracle Uf
     oracle = create_simon_oracle(hidden_period, n)
-    circuit.compose(oracle, inplace=True)
+    circuit_no_measure.compose(oracle, inplace=True)
     
     # Apply Hadamard to first register again
-    circuit.h(range(n))
+    circuit_no_measure.h(range(n))
     
     # Measure first register
+    circuit = circuit_no_measure.copy()
     circuit.measure(range(n), range(n))
     
-    return circuit
+    return circuit, circuit_no_measure
+
+def _simon_oracle_pairs(hidden_period: str, n: int) -> List[Tuple[int, int]]:
+    """(control, target) pairs of the CX gates making up the Simon oracle"""
+    # Pad or truncate period to match n
+    padded_period = hidden_period.ljust(n, '0')[:n]
+    
+    # Copy input to output (identity part)
+    pairs = [(i, i + n) for i in range(n)]
+    
+    # Add period structure: XOR s into the output whenever x_j = 1, where j is the
+    # first set bit of s, so that x and x⊕s map to the same output
+    if '1' in padded_period:
+        j = padded_period.index('1')
+        for i, bit in enumerate(padded_period):
+            if bit == '1':
+                pairs.append((j, i + n))
+    
+    return pairs
 
 def create_simon_oracle(hidden_period: str, n: int) -> QuantumCircuit:
     """Create oracle for Simon's algorithm where f(x) = f(x⊕s)"""
     total_qubits = 2 * n
     oracle = QuantumCircuit(total_qubits)
     
-    # Pad or truncate period to match n
-    padded_period = hidden_period.ljust(n, '0')[:n]
+    for control, target in _simon_oracle_pairs(hidden_period, n):
+        oracle.cx(control, target)
     
-    # Copy input to output (identity part)
-    for i in range(n):
-        oracle.cx(i, i + n)
+    return oracle
+
+def _simon_statevector(hidden_period: str, num_qubits: int) -> np.ndarray:
+    """Compute the Simon statevector directly with the compiled bitmask kernel"""
+    n = num_qubits // 2
+    pairs = np.array(_simon_oracle_pairs(hidden_period, n), dtype=np.int64).reshape(-1, 2)
     
-    # Add period structure
-    # This is a simplified oracle - in practice, the function would be more complex
-    for i, bit in enumerate(padded_period):
-        if bit == '1':
-            # Create correlation between input and output based on period
-            oracle.cx(i, (i + 1) % n + n)
+    psi = np.zeros(2 ** num_qubits, dtype=np.complex128)
+    psi[0] = 1
+    apply_simon(psi, n, pairs)
     
-    return oracle
+    return psi
 
-def simulate_simon(circuit: QuantumCircuit) -> tuple:
-    """Simulate Simon circuit and return results"""
-    try:
-        # Create a copy for statevector simulation (without measurements)
-        statevector_circuit = QuantumCircuit(circuit.num_qubits)
-        
-        # Copy all gates except measurements
-        for instruction in circuit.data:
-            if instruction.operation.name != 'measure':
-                statevector_circuit.append(instruction.operation, instruction.qubits, instruction.clbits)
-        
+@lru_cache(maxsize=128)
+def _build_and_transpile(hidden_period: str, num_qubits: int) -> QuantumCircuit:
+    """Build and transpile the statevector circuit (cached)"""
+    _, statevector_circuit = create_simon_circuit(hidden_period, num_qubits)
+    statevector_circuit.save_statevector()
+    
+    return transpile(statevector_circuit, _SV_SIM)
+
+def _bitstrings(indices: np.ndarray, n: int) -> List[str]:
+    """Format indices as n-bit binary strings in one vectorised pass"""
+    # Big-endian bytes put the most significant bit first after unpacking
+    bits = np.unpackbits(indices.astype('>u4').view(np.uint8).reshape(-1, 4), axis=1)[:, -n:]
+    return np.ascontiguousarray(bits + ord('0')).view(f'S{n}').ravel().astype(str).tolist()
+
+def _simon_distribution(hidden_period: str, num_qubits: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute statevector, probabilities and first-register measurement distribution"""
+    n = num_qubits // 2
+    
+    if num_qubits <= KERNEL_STATEVECTOR_MAX_QUBITS:
+        # Small circuits: skip Aer entirely, setup would dwarf the compute
+        statevector = _simon_statevector(hidden_period, num_qubits)
+    else:
         # State vector simulation
-        simulator = AerSimulator(method='statevector')
-        compiled_circuit = transpile(statevector_circuit, simulator)
-        job = simulator.run(compiled_circuit, shots=1)
+        job = _SV_SIM.run(_build_and_transpile(hidden_period, num_qubits), shots=1)
         result = job.result()
         
         try:
-            statevector = result.get_statevector()
+            statevector = np.asarray(result.get_statevector())
         except Exception as e:
             # Fallback if statevector extraction fails
-            print(f"Statevector extraction failed: {e}")
+            logger.warning("Statevector extraction failed: %s", e)
             # Create a simple uniform distribution as fallback
-            num_states = 2 ** circuit.num_qubits
+            num_states = 2 ** num_qubits
             statevector = np.ones(num_states, dtype=complex) / np.sqrt(num_states)
+    
+    # Calculate probabilities in a single float32 pass (no np.abs temporary)
+    probabilities = statevector.real.astype(np.float32)
+    probabilities *= probabilities
+    imag = statevector.imag.astype(np.float32)
+    probabilities += imag * imag
+    
+    # Measurement distribution of the first register
+    # (it holds the low bits of the little-endian index)
+    first_register_probs = probabilities.reshape(2 ** n, 2 ** n).sum(axis=0, dtype=np.float64)
+    first_register_probs /= first_register_probs.sum()
+    
+    return statevector, probabilities, first_register_probs
+
+@lru_cache(maxsize=CORE_CACHE_SIZE)
+def _simon_core(hidden_period: str, num_qubits: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cached _simon_distribution; the arrays are shared, so they are made read-only"""
+    arrays = _simon_distribution(hidden_period, num_qubits)
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+def simulate_simon(hidden_period: str, num_qubits: int) -> tuple:
+    """Simulate Simon circuit and return results"""
+    try:
+        n = num_qubits // 2
+        
+        # Only shot noise varies between runs, so small circuits reuse the cached distribution
+        if num_qubits <= CORE_CACHE_MAX_QUBITS:
+            statevector, probabilities, first_register_probs = _simon_core(hidden_period, num_qubits)
+        else:
+            statevector, probabilities, first_register_probs = _simon_distribution(hidden_period, num_qubits)
         
-        # Calculate probabilities
-        probabilities = np.abs(statevector) ** 2
-          # Measurement simulation with original circuit
-        measurement_simulator = AerSimulator(method='automatic')
-        compiled_measurement = transpile(circuit, measurement_simulator)
-        measurement_job = measurement_simulator.run(compiled_measurement, shots=1024)
-        measurement_result = measurement_job.result()
-        counts = measurement_result.get_counts()
+        # Sample measurements of the first register from the known distribution
+        samples = np.random.multinomial(1024, first_register_probs)
+        counts = dict(zip(_bitstrings(np.flatnonzero(samples), n), samples[samples > 0].tolist()))
         
-        return statevector, probabilities.tolist(), counts
+        return statevector, probabilities, counts
         
     except Exception as e:
-        print(f"Simon simulation error: {e}")
+        logger.warning("Simon simulation error: %s", e)
         # Return fallback results
-        num_states = 2 ** circuit.num_qubits
+        num_states = 2 ** num_qubits
         fallback_statevector = np.ones(num_states, dtype=complex) / np.sqrt(num_states)
-        fallback_probabilities = np.ones(num_states) / num_states
+        fallback_probabilities = np.full(num_states, 1 / num_states, dtype=np.float32)
         fallback_counts = {"00": 512, "01": 256, "10": 256}
         
-        return fallback_statevector, fallback_probabilities.tolist(), fallback_counts
+        return fallback_statevector, fallback_probabilities, fallback_counts
 
-def extract_linear_equations(counts: Dict[str, int], hidden_period: str, n: int) -> List[str]:
+def top_k_indices(probabilities: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k most probable basis states, in ascending index order"""
+    if top_k >= probabilities.size:
+        return np.arange(probabilities.size)
+    
+    # Ascending order keeps the full-state case identical to the untruncated output
+    return np.sort(np.argpartition(-probabilities, top_k)[:top_k])
+
+def extract_linear_equations(counts: Dict[str, int], n: int) -> List[str]:
     """Extract linear equations from measurement results"""
     equations = []
-    padded_period = hidden_period.ljust(n, '0')[:n]
+    # Variable for each bit position of the measurement int (bit k is qubit k, as in the solver)
+    variables = tuple(f's_{bit}' for bit in range(n))
     
-    # Get most frequent measurement outcomes (excluding all-zeros)
-    sorted_counts = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    # Get most frequent measurement outcomes; at most one of them is all-zeros
+    top_counts = heapq.nlargest(max(n - 1, 1) + 1, counts.items(), key=lambda x: x[1])
     
-    for i, (measurement, count) in enumerate(sorted_counts):
+    for measurement, count in top_counts:
+        y = int(measurement, 2)
         # Skip the all-zeros measurement (trivial solution)
-        if measurement == '0' * len(measurement):
+        if not y:
             continue
-            
-        # Each measurement y satisfies y·s = 0 (mod 2)
+        
+        # Each measurement y satisfies y·s = 0 (mod 2); walk its set bits lowest first
         equation_parts = []
-        for j, y_bit in enumerate(measurement):
-            if y_bit == '1':
-                equation_parts.append(f's_{j}')
+        while y:
+            lowest = y & -y
+            equation_parts.append(variables[lowest.bit_length() - 1])
+            y ^= lowest
         
-        if equation_parts:
-            equation = ' ⊕ '.join(equation_parts) + ' = 0'
-            equations.append(equation)
+        equations.append(' ⊕ '.join(equation_parts) + ' = 0')
         
         if len(equations) >= n - 1:  # Need n-1 linearly independent equations
             break
@@ -153,26 +253,57 @@ def extract_linear_equations(counts: Dict[str, int], hidden_period: str, n: int)
     
     return equations
 
-def solve_linear_system(equations: List[str], n: int, hidden_period: str) -> str:
-    """Solve system of linear equations to recover the period"""
-    # For demonstration purposes, we'll return the actual hidden period
-    # In a real implementation, you would use Gaussian elimination over GF(2)
-    # to solve the system of linear equations
+def extract_equation_masks(counts: Dict[str, int]) -> np.ndarray:
+    """Pack each measured outcome y into a uint64 mask (bit k = qubit k) for y·s = 0"""
+    return np.array([int(measurement, 2) for measurement in counts], dtype=np.uint64)
+
+def _solve_gf2(eq_rows: np.ndarray, n: int) -> int:
+    """Gaussian elimination over GF(2) on packed rows; returns a nonzero nullspace vector or 0"""
+    rows = eq_rows.copy()
+    pivot_cols = []
+    r = 0
+    for c in range(n):
+        bit = np.uint64(1 << c)
+        candidates = np.flatnonzero(rows[r:] & bit) + r
+        if candidates.size == 0:
+            continue
+        
+        pivot = candidates[0]
+        rows[[r, pivot]] = rows[[pivot, r]]
+        
+        # Clear column c from every other row in one vectorised XOR
+        others = (rows & bit) != 0
+        others[r] = False
+        rows[others] ^= rows[r]
+        
+        pivot_cols.append(c)
+        r += 1
+        if r == rows.size:
+            break
+    
+    free_cols = [c for c in range(n) if c not in pivot_cols]
+    if not free_cols:
+        # Full rank: only the trivial solution s = 0
+        return 0
+    
+    # Set the first free variable; each pivot variable then equals that column of its row
+    free = free_cols[0]
+    s = 1 << free
+    for row, c in zip(rows.tolist(), pivot_cols):
+        if (row >> free) & 1:
+            s |= 1 << c
     
-    # For now, return the hidden period (since this is what the algorithm should discover)
-    return hidden_period
+    return s
 
-@router.post("/simon/run", response_model=SimonResponse)
-async def run_simon_algorithm(request: SimonRequest):
-    """Run Simon's algorithm with specified parameters"""
+def solve_linear_system(equation_masks: np.ndarray, n: int) -> str:
+    """Solve system of linear equations over GF(2) to recover the period"""
+    s = _solve_gf2(equation_masks, n)
+    # Bit k is qubit k, which is character k of the hidden period string
+    return format(s, f'0{n}b')[::-1]
+
+def _run_simon_sync(request: SimonRequest) -> ORJSONResponse:
+    """Run Simon's algorithm synchronously (CPU-bound, called off the event loop)"""
     try:
-        # Validate hidden period (should be binary)
-        if not all(bit in '01' for bit in request.hidden_period):
-            raise HTTPException(
-                status_code=400,
-                detail="Hidden period must contain only 0s and 1s"
-            )
-        
         if request.num_qubits % 2 != 0:
             raise HTTPException(
                 status_code=400,
@@ -180,67 +311,81 @@ async def run_simon_algorithm(request: SimonRequest):
             )
         
         n = request.num_qubits // 2
+        # Pad or truncate period to match n once, so equivalent periods share cache entries
+        padded_period = request.hidden_period.ljust(n, '0')[:n]
         
-        # Create and simulate circuit
-        circuit = create_simon_circuit(request.hidden_period, request.num_qubits)
-        statevector, probabilities, counts = simulate_simon(circuit)        # Extract linear equations and solve
-        linear_equations = extract_linear_equations(counts, request.hidden_period, n)
-        recovered_period = solve_linear_system(linear_equations, n, request.hidden_period)
+        # Simulate circuit
+        statevector, probabilities, counts = simulate_simon(padded_period, request.num_qubits)
+        # Extract linear equations and solve
+        linear_equations = extract_linear_equations(counts, n)
+        recovered_period = solve_linear_system(extract_equation_masks(counts), n)
         
-        # Debug output
-        print(f"Simon's Algorithm Debug:")
-        print(f"  Input hidden_period: {request.hidden_period}")
-        print(f"  Measurement counts: {counts}")
-        print(f"  Linear equations: {linear_equations}")
-        print(f"  Recovered period: {recovered_period}")
+        # Debug output (skipped entirely unless debug logging is enabled)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Simon: hidden_period=%s counts=%s equations=%s recovered=%s",
+                request.hidden_period, counts, linear_equations, recovered_period
+            )
         
-        # Convert statevector to JSON-serializable format
-        quantum_state = [ComplexNumber(real=float(amp.real), imag=float(amp.imag)) for amp in statevector]
+        # Select the top_k amplitudes; the arrays are serialized by orjson directly
+        indices = top_k_indices(probabilities, request.top_k)
+        amplitudes = statevector[indices]
+        quantum_state = {
+            "indices": indices,
+            "real": amplitudes.real.astype(np.float32),
+            "imag": amplitudes.imag.astype(np.float32)
+        }
         
         # Prepare circuit data for visualization
         circuit_data = {
             "num_qubits": request.num_qubits,
             "hidden_period": request.hidden_period,
-            "gates": extract_gate_sequence(circuit)
+            "gates": _simon_gate_sequence(padded_period, request.num_qubits)
         }
         
-        return SimonResponse(
-            success=True,            circuit_data=circuit_data,
-            quantum_state=quantum_state,
-            probabilities=probabilities,
-            measurement_counts=counts,
-            linear_equations=linear_equations,
-            recovered_period=recovered_period,
-            hidden_period=request.hidden_period
-        )
+        # Returned as-is (shape documented by SimonResponse) so the NumPy arrays
+        # skip Pydantic validation and Python float boxing
+        return ORJSONResponse({
+            "success": True,
+            "circuit_data": circuit_data,
+            "quantum_state": quantum_state,
+            "probabilities": probabilities[indices],
+            "measurement_counts": counts,
+            "linear_equations": linear_equations,
+            "recovered_period": recovered_period,
+            "hidden_period": request.hidden_period
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/simon/simulate", response_model=SimonResponse)
+@router.post("/simon/run", response_class=ORJSONResponse, responses={200: {"model": SimonResponse}})
+async def run_simon_algorithm(request: SimonRequest):
+    """Run Simon's algorithm with specified parameters"""
+    return await asyncio.to_thread(_run_simon_sync, request)
+
+@router.post("/simon/simulate", response_class=ORJSONResponse, responses={200: {"model": SimonResponse}})
 async def simulate_simon_algorithm(request: SimonRequest):
     """Alias for /simon/run - simulate Simon's algorithm"""
-    return await run_simon_algorithm(request)
+    return await asyncio.to_thread(_run_simon_sync, request)
+
+@lru_cache(maxsize=64)
+def _simon_gate_sequence(hidden_period: str, num_qubits: int) -> List[Dict[str, Any]]:
+    """Gate sequence of the measured Simon circuit (cached, treat as read-only)"""
+    circuit, _ = create_simon_circuit(hidden_period, num_qubits)
+    return extract_gate_sequence(circuit)
 
 def extract_gate_sequence(circuit: QuantumCircuit) -> List[Dict[str, Any]]:
     """Extract gate sequence from circuit for visualization"""
-    gates = []
-    for instruction in circuit.data:
-        try:
-            gate_info = {
-                "name": instruction.operation.name,
-                "qubits": [q.index for q in instruction.qubits],
-                "params": instruction.operation.params if hasattr(instruction.operation, 'params') else []
-            }
-            gates.append(gate_info)
-        except Exception as e:
-            # Fallback for any instruction format issues
-            gates.append({
-                "name": "unknown",
-                "qubits": [],
-                "params": []
-            })
-    return gates
+    qubit_index = {qubit: i for i, qubit in enumerate(circuit.qubits)}
+    return [
+        {
+            "name": instruction.operation.name,
+            "qubits": [qubit_index[q] for q in instruction.qubits],
+            "params": list(instruction.operation.params)
+        }
+        for instruction in circuit.data
+    ]
 
 @router.get("/simon/info")
 async def get_simon_info():
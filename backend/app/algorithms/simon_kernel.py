@@ -0,0 +1,45 @@
+import numpy as np
+from numba import njit
+
+INV_SQRT2 = 1 / np.sqrt(2)
+
+@njit(fastmath=True, cache=True)
+def _apply_h(psi, qubit):
+    """Apply a Hadamard to one qubit of a little-endian statevector in place"""
+    mask = 1 << qubit
+    low = mask - 1
+    for k in range(psi.size >> 1):
+        # Insert a 0 at the qubit's bit position to get the pair (i, i | mask)
+        i = ((k >> qubit) << (qubit + 1)) | (k & low)
+        j = i | mask
+        a = psi[i]
+        b = psi[j]
+        psi[i] = (a + b) * INV_SQRT2
+        psi[j] = (a - b) * INV_SQRT2
+
+@njit(fastmath=True, cache=True)
+def _apply_cx(psi, control, target):
+    """Apply a CX gate to a little-endian statevector in place"""
+    control_mask = 1 << control
+    target_mask = 1 << target
+    first = min(control, target)
+    second = max(control, target)
+    for k in range(psi.size >> 2):
+        # Insert 0s at both bit positions, then set the control bit
+        i = ((k >> first) << (first + 1)) | (k & ((1 << first) - 1))
+        i = ((i >> second) << (second + 1)) | (i & ((1 << second) - 1))
+        i |= control_mask
+        j = i | target_mask
+        a = psi[i]
+        psi[i] = psi[j]
+        psi[j] = a
+
+@njit(cache=True)
+def apply_simon(psi, n, pairs):
+    """Apply H layer, oracle CX pairs and H layer on the first n qubits of psi in place"""
+    for q in range(n):
+        _apply_h(psi, q)
+    for p in range(pairs.shape[0]):
+        _apply_cx(psi, pairs[p, 0], pairs[p, 1])
+    for q in range(n):
+        _apply_h(psi, q)
@@ -158,6 +158,82 @@ class TestSimonAlgorithm:
         assert "result" in data
         assert "iterations_used" in data
         assert "measurements" in data
+    
+    def test_simon_invalid_period(self):
+        for hidden_period in ["12", ""]:
+            payload = {
+                "hidden_period": hidden_period,
+                "num_qubits": 4
+            }
+            response = client.post("/api/algorithms/simon/run", json=payload)
+            assert response.status_code == 422
+            assert "only 0s and 1s" in response.json()["detail"][0]["msg"]
+    
+    def test_simon_equations_match_recovered_period(self):
+        for hidden_period, num_qubits in [("10", 4), ("01", 4), ("110", 6), ("011", 6), ("1011", 8)]:
+            payload = {"hidden_period": hidden_period, "num_qubits": num_qubits}
+            response = client.post("/api/algorithms/simon/run", json=payload)
+            assert response.status_code == 200
+            data = response.json()
+            assert data["recovered_period"] == hidden_period
+            
+            # Every equation s_i ⊕ s_j ⊕ ... = 0 must hold for the recovered period
+            for equation in data["linear_equations"]:
+                variables = equation.split(" = ")[0].split(" ⊕ ")
+                bits = [int(data["recovered_period"][int(v[2:])]) for v in variables]
+                assert sum(bits) % 2 == 0, (hidden_period, equation)
+    
+    def test_simon_top_k_truncation(self):
+        payload = {"hidden_period": "1", "num_qubits": 4, "top_k": 3}
+        response = client.post("/api/algorithms/simon/run", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        state = data["quantum_state"]
+        indices = state["indices"]
+        probabilities = data["probabilities"]
+        assert len(indices) == len(state["real"]) == len(state["imag"]) == len(probabilities) == 3
+        assert all(a < b for a, b in zip(indices, indices[1:]))
+        
+        for p, re, im in zip(probabilities, state["real"], state["imag"]):
+            assert p == pytest.approx(re ** 2 + im ** 2, abs=1e-6)
+        
+        # The full state (2^4 <= top_k) gives the probabilities of the omitted indices
+        full = client.post("/api/algorithms/simon/run", json={**payload, "top_k": 16}).json()
+        omitted = [p for i, p in enumerate(full["probabilities"]) if i not in indices]
+        assert min(probabilities) >= max(omitted) - 1e-6
+        
+        response = client.post("/api/algorithms/simon/run", json={**payload, "top_k": 0})
+        assert response.status_code == 422
+    
+    def test_simon_kernel_matches_qiskit_statevector(self):
+        import itertools
+        import numpy as np
+        from qiskit.quantum_info import Statevector
+        from app.algorithms.simon import create_simon_circuit, _simon_statevector
+        
+        for num_qubits in range(2, 9, 2):
+            n = num_qubits // 2
+            for bits in itertools.product("01", repeat=n):
+                hidden_period = "".join(bits)
+                _, circuit_no_measure = create_simon_circuit(hidden_period, num_qubits)
+                expected = Statevector.from_instruction(circuit_no_measure).data
+                assert np.allclose(_simon_statevector(hidden_period, num_qubits), expected), hidden_period
+    
+    def test_simon_solver_recovers_every_period(self):
+        import itertools
+        import numpy as np
+        from app.algorithms.simon import solve_linear_system
+        
+        for n in range(1, 6):
+            for bits in itertools.product("01", repeat=n):
+                hidden_period = "".join(bits)
+                # Bit k of a mask is character k of the period string
+                s = int(hidden_period[::-1], 2)
+                masks = np.array(
+                    [y for y in range(2 ** n) if bin(y & s).count("1") % 2 == 0],
+                    dtype=np.uint64
+                )
+                assert solve_linear_system(masks, n) == hidden_period
 
 class TestCircuitUtils:
     